@@ -1,18 +1,25 @@
 import os
-import secrets
 import logging
+from typing import Optional
 
-from flask import Flask, g, has_request_context, render_template, request
+from flask import Flask, Response, g, has_request_context, render_template, request
 
-from provenance_engine import list_recent_cases, register_upload_as_new_version
-from utils.crypto_utils import sha256_file
-from utils.file_utils import save_upload
-from verifier import verify_file_against_provenance
+from provenance_engine import (
+    init_provenance,
+    list_recent_cases,
+    register_upload_as_new_version,
+)
+from utils.crypto_utils import canonical_json, sha256_backend, sha256_stream, token_hex
+from utils.file_utils import safe_upload_name, save_upload
+from verifier import begin_request_scope, end_request_scope, verify_hash_against_provenance
 
 
 BASE_DIR = os.path.dirname(__file__)
 DATA_DIR = os.path.join(BASE_DIR, "data")
 UPLOAD_DIR = os.path.join(DATA_DIR, "uploads")
+HISTORY_PAGE_SIZE = 50
+# Keeps the OFFSET well inside SQLite's 64-bit INTEGER range.
+HISTORY_MAX_PAGE = 1_000_000
 
 
 class _RequestIdFilter(logging.Filter):
@@ -49,15 +56,33 @@ def create_app() -> Flask:
 
     _configure_logging(app)
 
+    backend = sha256_backend()
+    if backend == "builtin":
+        # Python built without OpenSSL: hashing falls back to the slow portable code.
+        app.logger.warning("crypto_backend sha256=%s (no hardware acceleration)", backend)
+    else:
+        app.logger.info("crypto_backend sha256=%s", backend)
+
     # Backend-enforced limits (avoid memory/disk abuse).
     app.config["MAX_CONTENT_LENGTH"] = 10 * 1024 * 1024  # 10 MB
 
     os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+    # Schema, HMAC key and system ID are set up once here, not per request.
+    init_provenance()
+
     @app.before_request
     def _attach_request_context():
         # Request correlation ID for audit trails and logs.
-        g.request_id = secrets.token_hex(16)
+        g.request_id = token_hex(16)
+        g.chain_scope = begin_request_scope()
+
+    @app.teardown_request
+    def _close_request_context(exc):
+        # Runs even when the view raised; drops this request's cached chain results.
+        token = g.pop("chain_scope", None)
+        if token is not None:
+            end_request_scope(token)
 
     @app.get("/")
     def index():
@@ -79,12 +104,10 @@ def create_app() -> Flask:
             return render_template("result.html", error="No file selected")
 
         try:
-            filename, stored_path = save_upload(f, UPLOAD_DIR)
+            filename, stored_path, file_hash = save_upload(f, UPLOAD_DIR)
         except ValueError as e:
             return render_template("result.html", error=str(e))
 
-        file_hash = sha256_file(stored_path)
-
         client_ip = request.headers.get("X-Forwarded-For", request.remote_addr)
         user_agent = request.headers.get("User-Agent")
 
@@ -137,10 +160,13 @@ def create_app() -> Flask:
             return render_template("verify.html", error="No file selected")
 
         try:
-            filename, tmp_path = save_upload(f, UPLOAD_DIR)
+            filename = safe_upload_name(f)
         except ValueError as e:
             return render_template("verify.html", error=str(e))
 
+        # Only the digest is needed: hash the upload stream, no temp file on disk.
+        observed = sha256_stream(f.stream)
+
         raw_case_id = request.form.get("case_id")
         case_id = int(raw_case_id) if raw_case_id and raw_case_id.isdigit() else None
 
@@ -148,26 +174,20 @@ def create_app() -> Flask:
         user_agent = request.headers.get("User-Agent")
 
         try:
-            try:
-                result = verify_file_against_provenance(
-                    file_path=tmp_path,
-                    filename=filename,
-                    case_id=case_id,
-                    request_id=g.request_id,
-                    client_ip=client_ip,
-                    user_agent=user_agent,
-                )
-            except ValueError as e:
-                return render_template(
-                    "verify.html",
-                    filename=filename,
-                    error=str(e),
-                )
-        finally:
-            try:
-                os.remove(tmp_path)
-            except OSError:
-                pass
+            result = verify_hash_against_provenance(
+                observed_sha256=observed,
+                filename=filename,
+                case_id=case_id,
+                request_id=g.request_id,
+                client_ip=client_ip,
+                user_agent=user_agent,
+            )
+        except ValueError as e:
+            return render_template(
+                "verify.html",
+                filename=filename,
+                error=str(e),
+            )
 
         app.logger.info(
             "verify_result status=%s case_id=%s filename=%s",
@@ -192,11 +212,33 @@ def create_app() -> Flask:
             return render_template("history.html", error="Case not found")
 
         chain = validate_case_chain(case_id)
-        records = list_provenance_events(case_id)
+
+        # Without ?page the whole timeline is shown; ?page=N opts into fixed-size pages.
+        raw_page = request.args.get("page")
+        page: Optional[int] = None
+        has_next = False
+        if raw_page is None:
+            records = list_provenance_events(case_id)
+        else:
+            # str.isdigit() accepts e.g. "²", which int() rejects, so parse with int().
+            try:
+                page = int(raw_page)
+            except ValueError:
+                page = 1
+            page = min(max(page, 1), HISTORY_MAX_PAGE)
+            # Fetch one extra row to know whether a next page exists.
+            records = list_provenance_events(
+                case_id,
+                limit=HISTORY_PAGE_SIZE + 1,
+                offset=(page - 1) * HISTORY_PAGE_SIZE,
+            )
+            has_next = len(records) > HISTORY_PAGE_SIZE
+            records = records[:HISTORY_PAGE_SIZE]
         app.logger.info(
-            "history_view case_id=%s chain_ok=%s records=%s",
+            "history_view case_id=%s chain_ok=%s page=%s records=%s",
             case_id,
             chain.ok,
+            page,
             len(records),
         )
         return render_template(
@@ -204,8 +246,23 @@ def create_app() -> Flask:
             case=case,
             chain=chain,
             records=records,
+            page=page,
+            has_next=has_next,
         )
 
+    @app.get("/history/<int:case_id>/events.ndjson")
+    def history_export(case_id: int):
+        from provenance_engine import get_case, iter_provenance_events
+
+        if get_case(case_id) is None:
+            return Response("Case not found\n", status=404, mimetype="text/plain")
+
+        app.logger.info("history_export case_id=%s", case_id)
+        # One JSON object per line, streamed straight off the cursor: memory stays flat
+        # for arbitrarily long cases.
+        lines = (canonical_json(event) + b"\n" for event in iter_provenance_events(case_id))
+        return Response(lines, mimetype="application/x-ndjson")
+
     @app.get("/history")
     def history_search():
         from flask import redirect
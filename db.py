@@ -1,5 +1,6 @@
 import os
 import sqlite3
+import threading
 from contextlib import contextmanager
 from typing import Iterator
 
@@ -7,6 +8,8 @@ from typing import Iterator
 BASE_DIR = os.path.dirname(__file__)
 DATA_DIR = os.path.join(BASE_DIR, "data")
 
+_local = threading.local()
+
 
 def _db_path() -> str:
     return os.environ.get("PROV_DB_PATH", os.path.join(DATA_DIR, "provenance.db"))
@@ -18,23 +21,59 @@ def _ensure_data_dir() -> None:
 
 def _connect() -> sqlite3.Connection:
     _ensure_data_dir()
-    conn = sqlite3.connect(_db_path())
+    conn = sqlite3.connect(_db_path(), cached_statements=256)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON")
     conn.execute("PRAGMA journal_mode = WAL")
-    conn.execute("PRAGMA synchronous = FULL")
+    # Under WAL, NORMAL never corrupts the database; a power loss can only drop the
+    # most recent commits (fsync happens at checkpoint instead of every commit).
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA wal_autocheckpoint = 1000")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+def _thread_connection() -> sqlite3.Connection:
+    # One long-lived connection per thread: PRAGMAs run once and sqlite3's
+    # prepared-statement cache survives across calls.
+    path = _db_path()
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != path:
+        if conn is not None:
+            conn.close()
+        conn = _connect()
+        _local.conn = conn
+        _local.path = path
     return conn
 
 
+def data_version(conn: sqlite3.Connection) -> int:
+    # Changes whenever another connection (any thread or process) commits to the database.
+    return int(conn.execute("PRAGMA data_version").fetchone()[0])
+
+
 @contextmanager
-def get_db() -> Iterator[sqlite3.Connection]:
-    conn = _connect()
+def get_db(immediate: bool = False) -> Iterator[sqlite3.Connection]:
+    conn = _thread_connection()
+    if immediate:
+        # Take the write lock up front for read-then-write sequences.
+        conn.execute("BEGIN IMMEDIATE")
     try:
         yield conn
         conn.commit()
-    except Exception:
+    except BaseException:
+        # The connection outlives this block; never leave a transaction open on it.
         conn.rollback()
         raise
+
+
+@contextmanager
+def read_connection() -> Iterator[sqlite3.Connection]:
+    # A private short-lived connection for reads that are consumed lazily (generators).
+    # It never shares, commits or rolls back the thread connection's transaction.
+    conn = _connect()
+    try:
+        yield conn
     finally:
         conn.close()
 
@@ -96,9 +135,25 @@ def init_db() -> None:
         conn.execute(
             "CREATE INDEX IF NOT EXISTS idx_cases_filename ON cases(filename)"
         )
+        # (case_id, version) serves the latest-version lookup and MAX(version) without a
+        # sort; it makes the old single-column index redundant.
         conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_file_versions_case ON file_versions(case_id)"
+            "CREATE INDEX IF NOT EXISTS idx_file_versions_case_version ON file_versions(case_id, version)"
         )
+        conn.execute("DROP INDEX IF EXISTS idx_file_versions_case")
+        # Secondary indexes end with the rowid, so (case_id) already orders by id.
         conn.execute(
             "CREATE INDEX IF NOT EXISTS idx_events_case ON provenance_events(case_id)"
         )
+
+        # Planner statistics. A fresh connection has no query history, so a bare
+        # PRAGMA optimize would do nothing here: gather them with ANALYZE when none
+        # exist yet, and afterwards let SQLite >= 3.46 refresh only stale ones
+        # (0x10000 = consider every table). Older SQLite re-runs ANALYZE.
+        has_stats = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+        ).fetchone()
+        if has_stats and sqlite3.sqlite_version_info >= (3, 46, 0):
+            conn.execute("PRAGMA optimize = 0x10002")
+        else:
+            conn.execute("ANALYZE")
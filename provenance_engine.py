@@ -1,15 +1,24 @@
 import os
 import secrets
+import threading
 import uuid
-from dataclasses import dataclass
+from concurrent.futures import Future
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
 import mimetypes
 
-from db import get_db, init_db
+from db import data_version, get_db, init_db, read_connection
 
-from utils.crypto_utils import hmac_sha256_hex, sha256_canonical_json
+from utils.crypto_utils import (
+    canonical_event_bytes,
+    hex_digest_equal,
+    hmac_sha256_hex,
+    hmac_sha256_hex_with,
+    hmac_sha256_keyed,
+    sha256_bytes,
+    sha256_canonical_json,
+)
 
 
 DATA_DIR = os.environ.get(
@@ -21,9 +30,80 @@ SYSTEM_ID_PATH = os.path.join(DATA_DIR, "system_id.txt")
 
 GENESIS_PREV_HASH = "GENESIS"
 
+_REQUIRED_EVENT_FIELDS = (
+    "id",
+    "case_id",
+    "action",
+    "file_hash",
+    "prev_hash",
+    "curr_hash",
+    "timestamp",
+    "system_id",
+    "request_id",
+    "record_hmac",
+)
+_REQUIRED_EVENT_FIELD_SET = frozenset(_REQUIRED_EVENT_FIELDS)
+
+# Module-level SQL text so sqlite3's per-connection statement cache gets hits.
+_LAST_EVENT_HASH_SQL = (
+    "SELECT curr_hash FROM provenance_events WHERE case_id = ? ORDER BY id DESC LIMIT 1"
+)
+_CHAIN_COLUMNS = (
+    "case_id",
+    "file_version_id",
+    "action",
+    "file_hash",
+    "prev_hash",
+    "curr_hash",
+    "timestamp",
+    "system_id",
+    "request_id",
+    "client_ip",
+    "user_agent",
+    "record_hmac",
+)
+_CHAIN_ROWS_SQL = (
+    f"SELECT {', '.join(_CHAIN_COLUMNS)} FROM provenance_events "
+    "WHERE case_id = ? ORDER BY id ASC"
+)
+_CASE_WITH_LATEST_VERSION_SQL = """
+    SELECT c.id, c.case_uuid, c.filename, c.created_time, c.system_id,
+           fv.id AS fv_id, fv.version AS fv_version, fv.stored_path AS fv_stored_path,
+           fv.file_hash AS fv_file_hash, fv.file_size AS fv_file_size,
+           fv.mime_type AS fv_mime_type, fv.upload_time AS fv_upload_time,
+           fv.system_id AS fv_system_id
+    FROM cases c
+    LEFT JOIN file_versions fv ON fv.case_id = c.id
+    WHERE c.id = ?
+    ORDER BY fv.version DESC
+    LIMIT 1
+"""
+_INSERT_EVENT_SQL = """
+    INSERT INTO provenance_events
+      (case_id, file_version_id, action, file_hash, prev_hash, curr_hash, timestamp, system_id, request_id, client_ip, user_agent, record_hmac)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+# Single-row append also reads back what SQLite actually stored (after type affinity).
+_INSERT_EVENT_RETURNING_SQL = (
+    _INSERT_EVENT_SQL.rstrip() + f" RETURNING id, {', '.join(_CHAIN_COLUMNS)}"
+)
+
+# Process-wide state: the key file, system ID and schema never change while running.
+_init_lock = threading.RLock()
+_initialized = False
+_hmac_key_cache: Optional[bytes] = None
+_system_id_cache: Optional[str] = None
+
+# Per-thread (i.e. per-connection) memo of chain results, keyed by case_id, holding
+# (data_version, result, tip curr_hash). An entry is only trusted while PRAGMA
+# data_version is unchanged, so edits made by any other connection or process
+# (including manual tampering) force a full re-validation. Appends made on this
+# connection move the cached tip forward instead (see _append_provenance_event).
+_CHAIN_MEMO_MAX = 4096
+_chain_memo = threading.local()
 
-@dataclass(frozen=True)
-class ChainValidationResult:
+
+class ChainValidationResult(NamedTuple):
     ok: bool
     error: Optional[str] = None
     failure_type: Optional[str] = None  # CHAIN | HMAC
@@ -38,7 +118,7 @@ def _ensure_data_dir() -> None:
     os.makedirs(DATA_DIR, exist_ok=True)
 
 
-def load_or_create_hmac_key() -> bytes:
+def _read_or_create_hmac_key() -> bytes:
     _ensure_data_dir()
     if os.path.exists(SECRET_KEY_PATH):
         with open(SECRET_KEY_PATH, "rb") as f:
@@ -55,7 +135,7 @@ def load_or_create_hmac_key() -> bytes:
     return key
 
 
-def load_or_create_system_id() -> str:
+def _read_or_create_system_id() -> str:
     _ensure_data_dir()
     if os.path.exists(SYSTEM_ID_PATH):
         with open(SYSTEM_ID_PATH, "r", encoding="utf-8") as f:
@@ -70,6 +150,24 @@ def load_or_create_system_id() -> str:
     return system_id
 
 
+def load_or_create_hmac_key() -> bytes:
+    global _hmac_key_cache
+    if _hmac_key_cache is None:
+        with _init_lock:
+            if _hmac_key_cache is None:
+                _hmac_key_cache = _read_or_create_hmac_key()
+    return _hmac_key_cache
+
+
+def load_or_create_system_id() -> str:
+    global _system_id_cache
+    if _system_id_cache is None:
+        with _init_lock:
+            if _system_id_cache is None:
+                _system_id_cache = _read_or_create_system_id()
+    return _system_id_cache
+
+
 def compute_record_hash(record_core: Dict[str, Any]) -> str:
     return sha256_canonical_json(record_core)
 
@@ -78,67 +176,120 @@ def compute_record_hmac(hmac_key: bytes, record_hash_hex: str) -> str:
     return hmac_sha256_hex(hmac_key, record_hash_hex)
 
 
-def validate_chain(records: List[Dict[str, Any]], hmac_key: bytes) -> ChainValidationResult:
+class _MissingEventField(Exception):
+    pass
+
+
+def _walk_chain(
+    rows: Iterable[Tuple[Any, ...]], hmac_key: bytes
+) -> Tuple[ChainValidationResult, str]:
+    # Rows are plain tuples in _CHAIN_COLUMNS order; unpacking them avoids a dict per record.
+    # Also returns the last verified curr_hash (the chain tip).
     prev = GENESIS_PREV_HASH
-    for idx, rec in enumerate(records):
-        for field in (
-            "id",
-            "case_id",
-            "action",
-            "file_hash",
-            "prev_hash",
-            "curr_hash",
-            "timestamp",
-            "system_id",
-            "request_id",
-            "record_hmac",
-        ):
-            if field not in rec:
-                return ChainValidationResult(
+    keyed_hmac = hmac_sha256_keyed(hmac_key)
+    for idx, (
+        case_id,
+        file_version_id,
+        action,
+        file_hash,
+        prev_hash,
+        curr_hash,
+        timestamp,
+        system_id,
+        request_id,
+        client_ip,
+        user_agent,
+        record_hmac,
+    ) in enumerate(rows):
+        if prev_hash != prev:
+            return (
+                ChainValidationResult(
                     False,
-                    f"Missing field '{field}' at index {idx}",
+                    f"Chain broken at index {idx}: prev_hash mismatch (expected {prev})",
                     "CHAIN",
-                )
-
-        if rec["prev_hash"] != prev:
-            return ChainValidationResult(
-                False,
-                f"Chain broken at index {idx}: prev_hash mismatch (expected {prev})",
-                "CHAIN",
+                ),
+                prev,
             )
 
-        core = {
-            "case_id": rec["case_id"],
-            "file_version_id": rec.get("file_version_id"),
-            "action": rec["action"],
-            "file_hash": rec["file_hash"],
-            "prev_hash": rec["prev_hash"],
-            "timestamp": rec["timestamp"],
-            "system_id": rec["system_id"],
-            "request_id": rec["request_id"],
-            "client_ip": rec.get("client_ip"),
-            "user_agent": rec.get("user_agent"),
-        }
-
-        expected_hash = compute_record_hash(core)
-        if rec["curr_hash"] != expected_hash:
-            return ChainValidationResult(
-                False, f"Record hash mismatch at index {idx}", "CHAIN"
+        expected_hash = sha256_bytes(
+            canonical_event_bytes(
+                case_id=case_id,
+                file_version_id=file_version_id,
+                action=action,
+                file_hash=file_hash,
+                prev_hash=prev_hash,
+                timestamp=timestamp,
+                system_id=system_id,
+                request_id=request_id,
+                client_ip=client_ip,
+                user_agent=user_agent,
+            )
+        )
+        if curr_hash != expected_hash:
+            return (
+                ChainValidationResult(False, f"Record hash mismatch at index {idx}", "CHAIN"),
+                prev,
             )
 
-        expected_hmac = compute_record_hmac(hmac_key, expected_hash)
-        if rec["record_hmac"] != expected_hmac:
-            return ChainValidationResult(False, f"HMAC mismatch at index {idx}", "HMAC")
-
-        prev = rec["curr_hash"]
+        expected_hmac = hmac_sha256_hex_with(keyed_hmac, expected_hash)
+        if not hex_digest_equal(record_hmac, expected_hmac):
+            return ChainValidationResult(False, f"HMAC mismatch at index {idx}", "HMAC"), prev
+
+        prev = curr_hash
+
+    return ChainValidationResult(True), prev
+
+
+def _chain_memo_for(conn: Any) -> Dict[int, Tuple[int, ChainValidationResult, str]]:
+    if getattr(_chain_memo, "conn", None) is not conn:
+        _chain_memo.conn = conn
+        _chain_memo.entries = {}
+    return _chain_memo.entries
+
+
+def validate_chain(
+    records: Iterable[Dict[str, Any]], hmac_key: bytes
+) -> ChainValidationResult:
+    # Consumes records in one pass; an iterator (e.g. iter_provenance_events) is fine.
+    def rows() -> Iterator[Tuple[Any, ...]]:
+        for idx, rec in enumerate(records):
+            # Set containment runs in C; only walk the field list to name the missing one.
+            if not rec.keys() >= _REQUIRED_EVENT_FIELD_SET:
+                field = next(f for f in _REQUIRED_EVENT_FIELDS if f not in rec)
+                raise _MissingEventField(f"Missing field '{field}' at index {idx}")
+            yield (
+                rec["case_id"],
+                rec.get("file_version_id"),
+                rec["action"],
+                rec["file_hash"],
+                rec["prev_hash"],
+                rec["curr_hash"],
+                rec["timestamp"],
+                rec["system_id"],
+                rec["request_id"],
+                rec.get("client_ip"),
+                rec.get("user_agent"),
+                rec["record_hmac"],
+            )
 
-    return ChainValidationResult(True)
+    try:
+        return _walk_chain(rows(), hmac_key)[0]
+    except _MissingEventField as e:
+        return ChainValidationResult(False, str(e), "CHAIN")
 
 
 def init_provenance() -> None:
-    init_db()
-    load_or_create_hmac_key()
-    load_or_create_system_id()
+    # Boot-time setup; call once before any other function in this module (create_app does).
+    global _initialized
+    if _initialized:
+        return
+    with _init_lock:
+        if _initialized:
+            return
+        init_db()
+        load_or_create_hmac_key()
+        load_or_create_system_id()
+        _initialized = True
 
 
 def _row_to_dict(row: Any) -> Dict[str, Any]:
@@ -150,39 +301,41 @@ def _guess_mime_type(filename: str) -> Optional[str]:
     return mime
 
 
-def get_or_create_case_by_filename(*, filename: str) -> Dict[str, Any]:
-    init_provenance()
+def _get_or_create_case_by_filename(conn: Any, *, filename: str) -> Dict[str, Any]:
     system_id = load_or_create_system_id()
     ts = _utc_timestamp()
 
-    with get_db() as conn:
-        row = conn.execute(
-            "SELECT * FROM cases WHERE filename = ? ORDER BY id DESC LIMIT 1",
-            (filename,),
-        ).fetchone()
-        if row:
-            return _row_to_dict(row)
-
-        case_uuid = str(uuid.uuid4())
-        cur = conn.execute(
-            """
-            INSERT INTO cases (case_uuid, filename, created_time, system_id)
-            VALUES (?, ?, ?, ?)
-            """,
-            (case_uuid, filename, ts, system_id),
-        )
-        case_id = int(cur.lastrowid)
-        return {
-            "id": case_id,
-            "case_uuid": case_uuid,
-            "filename": filename,
-            "created_time": ts,
-            "system_id": system_id,
-        }
+    row = conn.execute(
+        "SELECT * FROM cases WHERE filename = ? ORDER BY id DESC LIMIT 1",
+        (filename,),
+    ).fetchone()
+    if row:
+        return _row_to_dict(row)
+
+    case_uuid = str(uuid.uuid4())
+    cur = conn.execute(
+        """
+        INSERT INTO cases (case_uuid, filename, created_time, system_id)
+        VALUES (?, ?, ?, ?)
+        """,
+        (case_uuid, filename, ts, system_id),
+    )
+    case_id = int(cur.lastrowid)
+    return {
+        "id": case_id,
+        "case_uuid": case_uuid,
+        "filename": filename,
+        "created_time": ts,
+        "system_id": system_id,
+    }
+
+
+def get_or_create_case_by_filename(*, filename: str) -> Dict[str, Any]:
+    with get_db(immediate=True) as conn:
+        return _get_or_create_case_by_filename(conn, filename=filename)
 
 
 def get_latest_case_by_filename(filename: str) -> Optional[Dict[str, Any]]:
-    init_provenance()
     with get_db() as conn:
         row = conn.execute(
             "SELECT * FROM cases WHERE filename = ? ORDER BY id DESC LIMIT 1",
@@ -192,13 +345,45 @@ def get_latest_case_by_filename(filename: str) -> Optional[Dict[str, Any]]:
 
 
 def get_case(case_id: int) -> Optional[Dict[str, Any]]:
-    init_provenance()
     with get_db() as conn:
         row = conn.execute("SELECT * FROM cases WHERE id = ?", (case_id,)).fetchone()
         return _row_to_dict(row) if row else None
 
 
-def create_file_version(
+def get_case_with_latest_version(
+    case_id: int,
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    # One round trip for the verify path: the case row plus its newest file version.
+    with get_db() as conn:
+        row = conn.execute(_CASE_WITH_LATEST_VERSION_SQL, (case_id,)).fetchone()
+    if row is None:
+        return None, None
+
+    case = {
+        "id": row["id"],
+        "case_uuid": row["case_uuid"],
+        "filename": row["filename"],
+        "created_time": row["created_time"],
+        "system_id": row["system_id"],
+    }
+    if row["fv_id"] is None:
+        return case, None
+    version = {
+        "id": row["fv_id"],
+        "case_id": row["id"],
+        "version": row["fv_version"],
+        "stored_path": row["fv_stored_path"],
+        "file_hash": row["fv_file_hash"],
+        "file_size": row["fv_file_size"],
+        "mime_type": row["fv_mime_type"],
+        "upload_time": row["fv_upload_time"],
+        "system_id": row["fv_system_id"],
+    }
+    return case, version
+
+
+def _create_file_version(
+    conn: Any,
     *,
     case_id: int,
     stored_path: str,
@@ -206,44 +391,53 @@ def create_file_version(
     file_size: int,
     mime_type: Optional[str],
 ) -> Dict[str, Any]:
-    init_provenance()
     system_id = load_or_create_system_id()
     ts = _utc_timestamp()
 
-    with get_db() as conn:
-        cur = conn.execute(
-            """
-            SELECT COALESCE(MAX(version), 0) + 1 AS next_version
-            FROM file_versions
-            WHERE case_id = ?
-            """,
-            (case_id,),
-        )
-        next_version = int(cur.fetchone()["next_version"])
-
-        cur2 = conn.execute(
-            """
-            INSERT INTO file_versions (case_id, version, stored_path, file_hash, file_size, mime_type, upload_time, system_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (case_id, next_version, stored_path, file_hash, file_size, mime_type, ts, system_id),
+    # Version numbering and insert in one statement (RETURNING needs SQLite >= 3.35).
+    row = conn.execute(
+        """
+        INSERT INTO file_versions (case_id, version, stored_path, file_hash, file_size, mime_type, upload_time, system_id)
+        SELECT ?, COALESCE(MAX(version), 0) + 1, ?, ?, ?, ?, ?, ?
+        FROM file_versions
+        WHERE case_id = ?
+        RETURNING id, version
+        """,
+        (case_id, stored_path, file_hash, file_size, mime_type, ts, system_id, case_id),
+    ).fetchone()
+    return {
+        "id": int(row["id"]),
+        "case_id": case_id,
+        "version": int(row["version"]),
+        "stored_path": stored_path,
+        "file_hash": file_hash,
+        "file_size": file_size,
+        "mime_type": mime_type,
+        "upload_time": ts,
+        "system_id": system_id,
+    }
+
+
+def create_file_version(
+    *,
+    case_id: int,
+    stored_path: str,
+    file_hash: str,
+    file_size: int,
+    mime_type: Optional[str],
+) -> Dict[str, Any]:
+    with get_db(immediate=True) as conn:
+        return _create_file_version(
+            conn,
+            case_id=case_id,
+            stored_path=stored_path,
+            file_hash=file_hash,
+            file_size=file_size,
+            mime_type=mime_type,
         )
-        version_id = int(cur2.lastrowid)
-        return {
-            "id": version_id,
-            "case_id": case_id,
-            "version": next_version,
-            "stored_path": stored_path,
-            "file_hash": file_hash,
-            "file_size": file_size,
-            "mime_type": mime_type,
-            "upload_time": ts,
-            "system_id": system_id,
-        }
 
 
 def get_latest_file_version(case_id: int) -> Optional[Dict[str, Any]]:
-    init_provenance()
     with get_db() as conn:
         row = conn.execute(
             "SELECT * FROM file_versions WHERE case_id = ? ORDER BY version DESC LIMIT 1",
@@ -252,101 +446,338 @@ def get_latest_file_version(case_id: int) -> Optional[Dict[str, Any]]:
         return _row_to_dict(row) if row else None
 
 
-def append_provenance_event(
+def _seal_event(
     *,
     case_id: int,
     file_version_id: Optional[int],
     action: str,
     file_hash: str,
+    prev_hash: str,
     request_id: str,
     client_ip: Optional[str],
     user_agent: Optional[str],
 ) -> Dict[str, Any]:
-    init_provenance()
+    # INTEGER columns: hash the value SQLite will store, not e.g. "1" or 1.0.
+    case_id = int(case_id)
+    file_version_id = None if file_version_id is None else int(file_version_id)
+
     hmac_key = load_or_create_hmac_key()
     system_id = load_or_create_system_id()
     ts = _utc_timestamp()
 
-    with get_db() as conn:
-        last = conn.execute(
-            "SELECT * FROM provenance_events WHERE case_id = ? ORDER BY id DESC LIMIT 1",
-            (case_id,),
-        ).fetchone()
-        prev_hash = last["curr_hash"] if last else GENESIS_PREV_HASH
-
-        core = {
-            "case_id": case_id,
-            "file_version_id": file_version_id,
-            "action": action,
-            "file_hash": file_hash,
-            "prev_hash": prev_hash,
-            "timestamp": ts,
-            "system_id": system_id,
-            "request_id": request_id,
-            "client_ip": client_ip,
-            "user_agent": user_agent,
-        }
-        curr_hash = compute_record_hash(core)
-        record_hmac = compute_record_hmac(hmac_key, curr_hash)
-
-        cur = conn.execute(
-            """
-            INSERT INTO provenance_events
-              (case_id, file_version_id, action, file_hash, prev_hash, curr_hash, timestamp, system_id, request_id, client_ip, user_agent, record_hmac)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                case_id,
-                file_version_id,
-                action,
-                file_hash,
-                prev_hash,
-                curr_hash,
-                ts,
-                system_id,
-                request_id,
-                client_ip,
-                user_agent,
-                record_hmac,
-            ),
+    curr_hash = sha256_bytes(
+        canonical_event_bytes(
+            case_id=case_id,
+            file_version_id=file_version_id,
+            action=action,
+            file_hash=file_hash,
+            prev_hash=prev_hash,
+            timestamp=ts,
+            system_id=system_id,
+            request_id=request_id,
+            client_ip=client_ip,
+            user_agent=user_agent,
         )
-        event_id = int(cur.lastrowid)
-        return {
-            "id": event_id,
-            "case_id": case_id,
-            "file_version_id": file_version_id,
-            "action": action,
-            "file_hash": file_hash,
-            "prev_hash": prev_hash,
-            "curr_hash": curr_hash,
-            "timestamp": ts,
-            "system_id": system_id,
-            "request_id": request_id,
-            "client_ip": client_ip,
-            "user_agent": user_agent,
-            "record_hmac": record_hmac,
-        }
-
-
-def list_provenance_events(case_id: int) -> List[Dict[str, Any]]:
-    init_provenance()
+    )
+    record_hmac = compute_record_hmac(hmac_key, curr_hash)
+
+    return {
+        "case_id": case_id,
+        "file_version_id": file_version_id,
+        "action": action,
+        "file_hash": file_hash,
+        "prev_hash": prev_hash,
+        "curr_hash": curr_hash,
+        "timestamp": ts,
+        "system_id": system_id,
+        "request_id": request_id,
+        "client_ip": client_ip,
+        "user_agent": user_agent,
+        "record_hmac": record_hmac,
+    }
+
+
+def _event_row(event: Dict[str, Any]) -> tuple:
+    # Column order of _INSERT_EVENT_SQL.
+    return (
+        event["case_id"],
+        event["file_version_id"],
+        event["action"],
+        event["file_hash"],
+        event["prev_hash"],
+        event["curr_hash"],
+        event["timestamp"],
+        event["system_id"],
+        event["request_id"],
+        event["client_ip"],
+        event["user_agent"],
+        event["record_hmac"],
+    )
+
+
+def _stored_row_hash(row: Tuple[Any, ...]) -> str:
+    # Recomputes curr_hash from a row in _CHAIN_COLUMNS order, as the chain walker does.
+    (
+        case_id,
+        file_version_id,
+        action,
+        file_hash,
+        prev_hash,
+        _curr_hash,
+        timestamp,
+        system_id,
+        request_id,
+        client_ip,
+        user_agent,
+        _record_hmac,
+    ) = row
+    return sha256_bytes(
+        canonical_event_bytes(
+            case_id=case_id,
+            file_version_id=file_version_id,
+            action=action,
+            file_hash=file_hash,
+            prev_hash=prev_hash,
+            timestamp=timestamp,
+            system_id=system_id,
+            request_id=request_id,
+            client_ip=client_ip,
+            user_agent=user_agent,
+        )
+    )
+
+
+def _last_event_hash(conn: Any, case_id: int) -> str:
+    last = conn.execute(_LAST_EVENT_HASH_SQL, (case_id,)).fetchone()
+    return last["curr_hash"] if last else GENESIS_PREV_HASH
+
+
+def _append_provenance_event(
+    conn: Any,
+    *,
+    case_id: int,
+    file_version_id: Optional[int],
+    action: str,
+    file_hash: str,
+    request_id: str,
+    client_ip: Optional[str],
+    user_agent: Optional[str],
+) -> Dict[str, Any]:
+    prev_hash = _last_event_hash(conn, case_id)
+    event = _seal_event(
+        case_id=case_id,
+        file_version_id=file_version_id,
+        action=action,
+        file_hash=file_hash,
+        prev_hash=prev_hash,
+        request_id=request_id,
+        client_ip=client_ip,
+        user_agent=user_agent,
+    )
+    stored = tuple(conn.execute(_INSERT_EVENT_RETURNING_SQL, _event_row(event)).fetchone())
+
+    # Our own commits do not move data_version, so the memo must be updated by hand.
+    # If the cached chain was valid, ends exactly where this event links in, and the
+    # row as stored still hashes to curr_hash, the tip just moves forward; otherwise
+    # drop the entry and let the next validation walk the whole chain.
+    case_id = event["case_id"]
+    memo = _chain_memo_for(conn)
+    hit = memo.get(case_id)
+    if (
+        hit is not None
+        and hit[1].ok
+        and hit[2] == prev_hash
+        and _stored_row_hash(stored[1:]) == event["curr_hash"]
+    ):
+        memo[case_id] = (hit[0], hit[1], event["curr_hash"])
+    else:
+        memo.pop(case_id, None)
+    return {"id": stored[0], **event}
+
+
+def append_provenance_event(
+    *,
+    case_id: int,
+    file_version_id: Optional[int],
+    action: str,
+    file_hash: str,
+    request_id: str,
+    client_ip: Optional[str],
+    user_agent: Optional[str],
+) -> Dict[str, Any]:
+    # IMMEDIATE takes the write lock before reading prev_hash, so concurrent
+    # appends to the same case cannot fork the chain.
+    with get_db(immediate=True) as conn:
+        return _append_provenance_event(
+            conn,
+            case_id=case_id,
+            file_version_id=file_version_id,
+            action=action,
+            file_hash=file_hash,
+            request_id=request_id,
+            client_ip=client_ip,
+            user_agent=user_agent,
+        )
+
+
+# Group commit for audit appends. Callers still block until their row is committed
+# (an audit event must not be lost if the process dies after the response), but
+# concurrent callers share one IMMEDIATE transaction: whoever takes the leader lock
+# drains everything queued so far and commits it in a single batch.
+_AUDIT_BATCH_MAX = 256
+_audit_queue: List[Tuple[Dict[str, Any], Future]] = []
+_audit_queue_lock = threading.Lock()
+_audit_leader_lock = threading.Lock()
+
+
+def _write_audit_batch(batch: List[Tuple[Dict[str, Any], Future]]) -> None:
+    # Each event runs under its own SAVEPOINT, so a bad event (FK violation, bad
+    # value) fails only its own caller; the rest of the batch still commits.
+    outcomes: List[Tuple[Future, Optional[Dict[str, Any]], Optional[Exception]]] = []
+    try:
+        with get_db(immediate=True) as conn:
+            for ev, fut in batch:
+                conn.execute("SAVEPOINT audit_event")
+                try:
+                    record = _append_provenance_event(conn, **ev)
+                except Exception as exc:
+                    conn.execute("ROLLBACK TO audit_event")
+                    conn.execute("RELEASE audit_event")
+                    outcomes.append((fut, None, exc))
+                else:
+                    conn.execute("RELEASE audit_event")
+                    outcomes.append((fut, record, None))
+    except BaseException as exc:
+        # The commit itself failed: nothing in the batch was written.
+        for _, fut in batch:
+            fut.set_exception(exc)
+        raise
+    for fut, record, error in outcomes:
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(record)
+
+
+def append_provenance_event_grouped(
+    *,
+    case_id: int,
+    file_version_id: Optional[int],
+    action: str,
+    file_hash: str,
+    request_id: str,
+    client_ip: Optional[str],
+    user_agent: Optional[str],
+) -> Dict[str, Any]:
+    fut: Future = Future()
+    event = dict(
+        case_id=case_id,
+        file_version_id=file_version_id,
+        action=action,
+        file_hash=file_hash,
+        request_id=request_id,
+        client_ip=client_ip,
+        user_agent=user_agent,
+    )
+    with _audit_queue_lock:
+        _audit_queue.append((event, fut))
+
+    while not fut.done():
+        with _audit_leader_lock:
+            if fut.done():
+                break
+            with _audit_queue_lock:
+                batch = _audit_queue[:_AUDIT_BATCH_MAX]
+                del _audit_queue[:_AUDIT_BATCH_MAX]
+            if batch:
+                try:
+                    _write_audit_batch(batch)
+                except Exception:
+                    # Already delivered to every future in the batch.
+                    pass
+    return fut.result()
+
+
+def append_provenance_events_bulk(events: List[Dict[str, Any]]) -> int:
+    # Each item takes append_provenance_event's keyword arguments. Events are chained
+    # in list order (per case) and written with one executemany in one transaction.
+    if not events:
+        return 0
+
+    with get_db(immediate=True) as conn:
+        tips: Dict[int, str] = {}
+        rows = []
+        for ev in events:
+            case_id = int(ev["case_id"])
+            prev_hash = tips.get(case_id)
+            if prev_hash is None:
+                prev_hash = _last_event_hash(conn, case_id)
+            sealed = _seal_event(
+                case_id=case_id,
+                file_version_id=ev.get("file_version_id"),
+                action=ev["action"],
+                file_hash=ev["file_hash"],
+                prev_hash=prev_hash,
+                request_id=ev["request_id"],
+                client_ip=ev.get("client_ip"),
+                user_agent=ev.get("user_agent"),
+            )
+            tips[case_id] = sealed["curr_hash"]
+            rows.append(_event_row(sealed))
+
+        conn.executemany(_INSERT_EVENT_SQL, rows)
+        memo = _chain_memo_for(conn)
+        for case_id in tips:
+            memo.pop(case_id, None)
+    return len(rows)
+
+
+def list_provenance_events(
+    case_id: int, limit: Optional[int] = None, offset: int = 0
+) -> List[Dict[str, Any]]:
     with get_db() as conn:
         rows = conn.execute(
-            "SELECT * FROM provenance_events WHERE case_id = ? ORDER BY id ASC",
-            (case_id,),
+            "SELECT * FROM provenance_events WHERE case_id = ? ORDER BY id ASC LIMIT ? OFFSET ?",
+            (case_id, -1 if limit is None else int(limit), int(offset)),
         ).fetchall()
         return [_row_to_dict(r) for r in rows]
 
 
+def iter_provenance_events(case_id: int) -> Iterator[Dict[str, Any]]:
+    # Streams rows off the cursor, so memory stays flat however long the case is. The
+    # generator may be abandoned half-way, so it reads on its own connection rather
+    # than inside get_db(), whose rollback would hit the thread's open transaction.
+    with read_connection() as conn:
+        for row in conn.execute(
+            "SELECT * FROM provenance_events WHERE case_id = ? ORDER BY id ASC",
+            (case_id,),
+        ):
+            yield _row_to_dict(row)
+
+
 def validate_case_chain(case_id: int) -> ChainValidationResult:
-    init_provenance()
+    # The memo is keyed (and evicted by appends) on the int ID; "1" must share it.
+    case_id = int(case_id)
     hmac_key = load_or_create_hmac_key()
-    records = list_provenance_events(case_id)
-    return validate_chain(records, hmac_key)
+    with get_db() as conn:
+        memo = _chain_memo_for(conn)
+        version = data_version(conn)
+        hit = memo.get(case_id)
+        if hit is not None and hit[0] == version:
+            return hit[1]
+
+        cur = conn.cursor()
+        # Plain tuples straight off the cursor: no sqlite3.Row or dict per record.
+        cur.row_factory = None
+        result, tip = _walk_chain(cur.execute(_CHAIN_ROWS_SQL, (case_id,)), hmac_key)
+
+        if len(memo) >= _CHAIN_MEMO_MAX:
+            memo.clear()
+        memo[case_id] = (version, result, tip)
+        return result
 
 
 def list_recent_cases(limit: int = 10) -> List[Dict[str, Any]]:
-    init_provenance()
     with get_db() as conn:
         rows = conn.execute(
             "SELECT * FROM cases ORDER BY id DESC LIMIT ?",
@@ -364,29 +795,32 @@ def register_upload_as_new_version(
     client_ip: Optional[str],
     user_agent: Optional[str],
 ) -> Dict[str, Any]:
-    init_provenance()
-
-    case = get_or_create_case_by_filename(filename=filename)
-    case_id = int(case["id"])
     file_size = int(os.path.getsize(stored_path))
     mime_type = _guess_mime_type(filename)
 
-    version = create_file_version(
-        case_id=case_id,
-        stored_path=stored_path,
-        file_hash=file_hash,
-        file_size=file_size,
-        mime_type=mime_type,
-    )
+    # Case, version and CREATE event commit together: one transaction, one WAL flush.
+    with get_db(immediate=True) as conn:
+        case = _get_or_create_case_by_filename(conn, filename=filename)
+        case_id = int(case["id"])
+
+        version = _create_file_version(
+            conn,
+            case_id=case_id,
+            stored_path=stored_path,
+            file_hash=file_hash,
+            file_size=file_size,
+            mime_type=mime_type,
+        )
 
-    event = append_provenance_event(
-        case_id=case_id,
-        file_version_id=int(version["id"]),
-        action="CREATE",
-        file_hash=file_hash,
-        request_id=request_id,
-        client_ip=client_ip,
-        user_agent=user_agent,
-    )
+        event = _append_provenance_event(
+            conn,
+            case_id=case_id,
+            file_version_id=int(version["id"]),
+            action="CREATE",
+            file_hash=file_hash,
+            request_id=request_id,
+            client_ip=client_ip,
+            user_agent=user_agent,
+        )
 
     return {"case": case, "version": version, "event": event}
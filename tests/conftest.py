@@ -29,5 +29,41 @@ def isolated_env(tmp_path, monkeypatch):
     import provenance_engine
 
     importlib.reload(provenance_engine)
+    provenance_engine.init_provenance()
 
     yield {"data_dir": data_dir, "db_path": db_path}
+
+
+@pytest.fixture()
+def app_client(isolated_env, monkeypatch):
+    # The repo ships no templates, so views render through a recorder instead.
+    import logging
+
+    import app as appmod
+
+    data_dir = isolated_env["data_dir"]
+    monkeypatch.setattr(appmod, "DATA_DIR", str(data_dir))
+    monkeypatch.setattr(appmod, "UPLOAD_DIR", str(data_dir / "uploads"))
+
+    rendered = []
+
+    def record_render(template_name, **context):
+        rendered.append((template_name, context))
+        return ""
+
+    monkeypatch.setattr(appmod, "render_template", record_render)
+
+    logger = logging.getLogger("provenance")
+    handlers_before = list(logger.handlers)
+    flask_app = appmod.create_app()
+
+    yield {
+        "client": flask_app.test_client(),
+        "rendered": rendered,
+        "upload_dir": data_dir / "uploads",
+    }
+
+    for handler in logger.handlers[:]:
+        if handler not in handlers_before:
+            logger.removeHandler(handler)
+            handler.close()
@@ -0,0 +1,131 @@
+import hashlib
+import io
+import json
+import sqlite3
+
+from verifier import verify_with_case_id
+
+
+def _upload(client, data, name="evidence.bin"):
+    return client.post(
+        "/upload",
+        data={"file": (io.BytesIO(data), name)},
+        content_type="multipart/form-data",
+    )
+
+
+def _verify(client, data, name="evidence.bin", case_id=None):
+    form = {"file": (io.BytesIO(data), name)}
+    if case_id is not None:
+        form["case_id"] = str(case_id)
+    return client.post("/verify", data=form, content_type="multipart/form-data")
+
+
+def test_request_chain_scope_does_not_outlive_the_request(app_client, isolated_env):
+    client, rendered = app_client["client"], app_client["rendered"]
+
+    assert _upload(client, b"original").status_code == 200
+    case_id = rendered[-1][1]["case_id"]
+    digest = rendered[-1][1]["file_sha256"]
+
+    assert _verify(client, b"original", case_id=case_id).status_code == 200
+    assert rendered[-1][1]["result"].status == "VALID"
+
+    conn = sqlite3.connect(isolated_env["db_path"])
+    try:
+        conn.execute("UPDATE provenance_events SET file_hash = ? WHERE id = 1", ("00" * 32,))
+        conn.commit()
+    finally:
+        conn.close()
+
+    # Outside any request, the result cached by the request above must not be reused.
+    res = verify_with_case_id(
+        observed_sha256=digest,
+        case_id=case_id,
+        request_id="direct",
+        client_ip=None,
+        user_agent=None,
+    )
+    assert res.status == "TAMPERED_CHAIN"
+
+
+def test_history_export_streams_every_event(app_client):
+    client, rendered = app_client["client"], app_client["rendered"]
+
+    _upload(client, b"original")
+    case_id = rendered[-1][1]["case_id"]
+    for _ in range(3):
+        _verify(client, b"original", case_id=case_id)
+
+    res = client.get(f"/history/{case_id}/events.ndjson")
+    assert res.status_code == 200
+    assert res.mimetype == "application/x-ndjson"
+    events = [json.loads(line) for line in res.data.splitlines()]
+    assert [e["action"] for e in events] == ["CREATE", "VERIFY", "VERIFY", "VERIFY"]
+
+    assert client.get(f"/history/{case_id + 1}/events.ndjson").status_code == 404
+
+
+def test_history_shows_full_timeline_unless_paged(app_client, monkeypatch):
+    import app as appmod
+
+    monkeypatch.setattr(appmod, "HISTORY_PAGE_SIZE", 2)
+    client, rendered = app_client["client"], app_client["rendered"]
+
+    _upload(client, b"original")
+    case_id = rendered[-1][1]["case_id"]
+    for _ in range(2):
+        _verify(client, b"original", case_id=case_id)
+
+    def view(query=""):
+        res = client.get(f"/history/{case_id}{query}")
+        assert res.status_code == 200
+        return rendered[-1][1]
+
+    full = view()
+    assert len(full["records"]) == 3
+    assert full["page"] is None and full["has_next"] is False
+
+    first = view("?page=1")
+    assert [r["action"] for r in first["records"]] == ["CREATE", "VERIFY"]
+    assert first["page"] == 1 and first["has_next"] is True
+
+    second = view("?page=2")
+    assert len(second["records"]) == 1
+    assert second["page"] == 2 and second["has_next"] is False
+
+    # Inputs that used to raise: "²" passes str.isdigit() but not int(), and a huge
+    # page number overflowed SQLite's INTEGER as an OFFSET.
+    for raw, expected in (("%C2%B2", 1), ("abc", 1), ("-3", 1), ("0", 1)):
+        ctx = view(f"?page={raw}")
+        assert ctx["page"] == expected and len(ctx["records"]) == 2
+
+    huge = view("?page=100000000000000000000")
+    assert huge["page"] == appmod.HISTORY_MAX_PAGE
+    assert huge["records"] == [] and huge["has_next"] is False
+
+
+def test_verify_route_hashes_stream_without_writing_uploads(app_client):
+    client, rendered = app_client["client"], app_client["rendered"]
+    upload_dir = app_client["upload_dir"]
+
+    _upload(client, b"original")
+    case_id = rendered[-1][1]["case_id"]
+    stored_before = sorted(p.name for p in upload_dir.iterdir())
+
+    assert _verify(client, b"original").status_code == 200
+    valid = rendered[-1][1]["result"]
+    assert valid.status == "VALID" and valid.case_id == case_id
+    assert valid.observed_sha256 == hashlib.sha256(b"original").hexdigest()
+
+    assert _verify(client, b"modified", case_id=case_id).status_code == 200
+    tampered = rendered[-1][1]["result"]
+    assert tampered.status == "TAMPERED_FILE"
+    assert tampered.observed_sha256 != tampered.expected_sha256
+
+    assert _verify(client, b"original", name="../").status_code == 200
+    template, ctx = rendered[-1]
+    assert template == "verify.html"
+    assert ctx["error"] == "Invalid filename" and "result" not in ctx
+
+    assert sorted(p.name for p in upload_dir.iterdir()) == stored_before
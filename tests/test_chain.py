@@ -1,10 +1,22 @@
 import sqlite3
+import threading
+import time
+
+import provenance_engine
+from db import get_db
 
 from provenance_engine import (
     append_provenance_event,
+    append_provenance_event_grouped,
+    append_provenance_events_bulk,
+    get_case_with_latest_version,
     get_or_create_case_by_filename,
+    iter_provenance_events,
+    list_provenance_events,
+    load_or_create_hmac_key,
     register_upload_as_new_version,
     validate_case_chain,
+    validate_chain,
 )
 
 
@@ -77,3 +89,379 @@ def test_chain_detects_hmac_tamper(isolated_env, tmp_path):
     res = validate_case_chain(case_id)
     assert res.ok is False
     assert res.failure_type == "HMAC"
+
+
+def test_bulk_append_extends_chain(isolated_env, tmp_path):
+    fpath = tmp_path / "bulk.bin"
+    fpath.write_bytes(b"hello")
+
+    reg = register_upload_as_new_version(
+        filename="bulk.bin",
+        stored_path=str(fpath),
+        file_hash="2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824",
+        request_id="req1",
+        client_ip="127.0.0.1",
+        user_agent="pytest",
+    )
+    case_id = int(reg["case"]["id"])
+
+    appended = append_provenance_events_bulk(
+        [
+            {
+                "case_id": case_id,
+                "action": "VERIFY",
+                "file_hash": reg["version"]["file_hash"],
+                "request_id": f"bulk{i}",
+            }
+            for i in range(3)
+        ]
+    )
+    assert appended == 3
+
+    records = list_provenance_events(case_id)
+    assert [r["action"] for r in records] == ["CREATE", "VERIFY", "VERIFY", "VERIFY"]
+    assert validate_case_chain(case_id).ok is True
+
+    page = list_provenance_events(case_id, limit=2, offset=1)
+    assert [r["id"] for r in page] == [r["id"] for r in records[1:3]]
+
+    streamed = validate_chain(iter_provenance_events(case_id), load_or_create_hmac_key())
+    assert streamed.ok is True
+
+
+def test_grouped_appends_from_threads_keep_chain_valid(isolated_env, tmp_path):
+    fpath = tmp_path / "grouped.bin"
+    fpath.write_bytes(b"hello")
+
+    reg = register_upload_as_new_version(
+        filename="grouped.bin",
+        stored_path=str(fpath),
+        file_hash="2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824",
+        request_id="req1",
+        client_ip="127.0.0.1",
+        user_agent="pytest",
+    )
+    case_id = int(reg["case"]["id"])
+
+    def worker(i):
+        append_provenance_event_grouped(
+            case_id=case_id,
+            file_version_id=None,
+            action="VERIFY",
+            file_hash=reg["version"]["file_hash"],
+            request_id=f"grp{i}",
+            client_ip=None,
+            user_agent=None,
+        )
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    records = list_provenance_events(case_id)
+    assert len(records) == 17
+    assert {r["request_id"] for r in records[1:]} == {f"grp{i}" for i in range(16)}
+    assert validate_case_chain(case_id).ok is True
+
+
+def test_reupload_gets_next_version(isolated_env, tmp_path):
+    fpath = tmp_path / "v.bin"
+    fpath.write_bytes(b"hello")
+
+    versions = [
+        register_upload_as_new_version(
+            filename="v.bin",
+            stored_path=str(fpath),
+            file_hash="2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824",
+            request_id=f"req{i}",
+            client_ip="127.0.0.1",
+            user_agent="pytest",
+        )["version"]
+        for i in range(3)
+    ]
+    assert [v["version"] for v in versions] == [1, 2, 3]
+    assert len({v["id"] for v in versions}) == 3
+
+    case, latest = get_case_with_latest_version(versions[0]["case_id"])
+    assert case["filename"] == "v.bin"
+    assert latest == versions[-1]
+
+    empty = get_or_create_case_by_filename(filename="empty.bin")
+    assert get_case_with_latest_version(empty["id"]) == (empty, None)
+    assert get_case_with_latest_version(9999) == (None, None)
+
+
+def test_chain_with_non_ascii_user_agent_validates(isolated_env, tmp_path):
+    fpath = tmp_path / "u.bin"
+    fpath.write_bytes(b"hello")
+
+    reg = register_upload_as_new_version(
+        filename="u.bin",
+        stored_path=str(fpath),
+        file_hash="2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824",
+        request_id="req1",
+        client_ip="127.0.0.1",
+        user_agent="Navigateur/1.0 (Système; Überprüfung)",
+    )
+    case_id = int(reg["case"]["id"])
+
+    assert validate_case_chain(case_id).ok is True
+
+
+def test_cached_chain_result_does_not_hide_later_tampering(isolated_env, tmp_path):
+    fpath = tmp_path / "c.bin"
+    fpath.write_bytes(b"hello")
+
+    reg = register_upload_as_new_version(
+        filename="c.bin",
+        stored_path=str(fpath),
+        file_hash="2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824",
+        request_id="req1",
+        client_ip="127.0.0.1",
+        user_agent="pytest",
+    )
+    case_id = int(reg["case"]["id"])
+
+    assert validate_case_chain(case_id).ok is True
+    append_provenance_event(
+        case_id=case_id,
+        file_version_id=None,
+        action="VERIFY",
+        file_hash=reg["version"]["file_hash"],
+        request_id="req2",
+        client_ip="127.0.0.1",
+        user_agent="pytest",
+    )
+    assert validate_case_chain(case_id).ok is True
+
+    conn = sqlite3.connect(isolated_env["db_path"])
+    try:
+        conn.execute(
+            "UPDATE provenance_events SET file_hash = ? WHERE id = (SELECT MIN(id) FROM provenance_events)",
+            ("00" * 32,),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    res = validate_case_chain(case_id)
+    assert res.ok is False
+    assert res.failure_type == "CHAIN"
+
+
+def test_own_appends_extend_cached_chain_without_rewalk(isolated_env, tmp_path, monkeypatch):
+    fpath = tmp_path / "tip.bin"
+    fpath.write_bytes(b"hello")
+
+    reg = register_upload_as_new_version(
+        filename="tip.bin",
+        stored_path=str(fpath),
+        file_hash="2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824",
+        request_id="req1",
+        client_ip="127.0.0.1",
+        user_agent="pytest",
+    )
+    case_id = int(reg["case"]["id"])
+    assert validate_case_chain(case_id).ok is True
+
+    walk = provenance_engine._walk_chain
+
+    def no_walk(*args, **kwargs):
+        raise AssertionError("chain was re-walked")
+
+    monkeypatch.setattr(provenance_engine, "_walk_chain", no_walk)
+    for i in range(3):
+        append_provenance_event(
+            case_id=case_id,
+            file_version_id=None,
+            action="VERIFY",
+            file_hash=reg["version"]["file_hash"],
+            request_id=f"tip{i}",
+            client_ip="127.0.0.1",
+            user_agent="pytest",
+        )
+        assert validate_case_chain(case_id).ok is True
+
+    # A write from another connection still forces a full walk, which catches it.
+    monkeypatch.setattr(provenance_engine, "_walk_chain", walk)
+    conn = sqlite3.connect(isolated_env["db_path"])
+    try:
+        conn.execute(
+            "UPDATE provenance_events SET request_id = 'forged' WHERE id = (SELECT MAX(id) FROM provenance_events)"
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    res = validate_case_chain(case_id)
+    assert res.ok is False
+    assert res.failure_type == "CHAIN"
+
+
+def test_loosely_typed_append_after_memoized_validation(isolated_env, tmp_path):
+    fpath = tmp_path / "loose.bin"
+    fpath.write_bytes(b"hello")
+
+    reg = register_upload_as_new_version(
+        filename="loose.bin",
+        stored_path=str(fpath),
+        file_hash="2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824",
+        request_id="req1",
+        client_ip="127.0.0.1",
+        user_agent="pytest",
+    )
+    case_id = int(reg["case"]["id"])
+    key = load_or_create_hmac_key()
+    assert validate_case_chain(case_id).ok is True
+
+    # INTEGER columns are normalised before sealing, so the stored row still hashes.
+    append_provenance_event(
+        case_id=str(case_id),
+        file_version_id=str(reg["version"]["id"]),
+        action="VERIFY",
+        file_hash=reg["version"]["file_hash"],
+        request_id="req2",
+        client_ip=None,
+        user_agent=None,
+    )
+    assert validate_case_chain(case_id).ok is True
+    assert validate_chain(list_provenance_events(case_id), key).ok is True
+
+    # A value SQLite rewrites on insert (int into a TEXT column) breaks the chain;
+    # the memo must not keep reporting the old ok result.
+    append_provenance_event(
+        case_id=case_id,
+        file_version_id=None,
+        action="VERIFY",
+        file_hash=reg["version"]["file_hash"],
+        request_id=12345,
+        client_ip=None,
+        user_agent=None,
+    )
+    assert validate_chain(list_provenance_events(case_id), key).ok is False
+    assert validate_case_chain(case_id).ok is False
+
+
+def test_chain_memo_is_shared_by_str_and_int_case_ids(isolated_env, tmp_path):
+    fpath = tmp_path / "key.bin"
+    fpath.write_bytes(b"hello")
+
+    reg = register_upload_as_new_version(
+        filename="key.bin",
+        stored_path=str(fpath),
+        file_hash="2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824",
+        request_id="req1",
+        client_ip="127.0.0.1",
+        user_agent="pytest",
+    )
+    case_id = int(reg["case"]["id"])
+    assert validate_case_chain(str(case_id)).ok is True
+
+    # TEXT affinity stores request_id as "12345", so this event no longer hashes.
+    append_provenance_event(
+        case_id=case_id,
+        file_version_id=None,
+        action="VERIFY",
+        file_hash=reg["version"]["file_hash"],
+        request_id=12345,
+        client_ip=None,
+        user_agent=None,
+    )
+    assert validate_case_chain(case_id).ok is False
+    assert validate_case_chain(str(case_id)).ok is False
+
+
+def test_abandoned_event_stream_does_not_roll_back_open_transaction(isolated_env, tmp_path):
+    fpath = tmp_path / "stream.bin"
+    fpath.write_bytes(b"hello")
+
+    reg = register_upload_as_new_version(
+        filename="stream.bin",
+        stored_path=str(fpath),
+        file_hash="2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824",
+        request_id="req1",
+        client_ip="127.0.0.1",
+        user_agent="pytest",
+    )
+    case_id = int(reg["case"]["id"])
+
+    with get_db(immediate=True) as conn:
+        provenance_engine._append_provenance_event(
+            conn,
+            case_id=case_id,
+            file_version_id=None,
+            action="VERIFY",
+            file_hash=reg["version"]["file_hash"],
+            request_id="req2",
+            client_ip=None,
+            user_agent=None,
+        )
+        events = iter_provenance_events(case_id)
+        next(events)
+        events.close()
+
+    assert [r["request_id"] for r in list_provenance_events(case_id)] == ["req1", "req2"]
+
+
+def test_poisoned_event_fails_only_its_own_grouped_caller(isolated_env, tmp_path):
+    fpath = tmp_path / "poison.bin"
+    fpath.write_bytes(b"hello")
+
+    reg = register_upload_as_new_version(
+        filename="poison.bin",
+        stored_path=str(fpath),
+        file_hash="2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824",
+        request_id="req1",
+        client_ip="127.0.0.1",
+        user_agent="pytest",
+    )
+    case_id = int(reg["case"]["id"])
+    outcomes = {}
+
+    def worker(name, target_case):
+        try:
+            append_provenance_event_grouped(
+                case_id=target_case,
+                file_version_id=None,
+                action="VERIFY",
+                file_hash=reg["version"]["file_hash"],
+                request_id=name,
+                client_ip=None,
+                user_agent=None,
+            )
+            outcomes[name] = "ok"
+        except sqlite3.IntegrityError:
+            outcomes[name] = "integrity"
+
+    # Hold the leader lock until all three events are queued, so one leader writes
+    # them as a single batch; the middle one violates the cases foreign key.
+    plan = [("good1", case_id), ("poison", case_id + 1000), ("good2", case_id)]
+    threads = [threading.Thread(target=worker, args=item) for item in plan]
+    with provenance_engine._audit_leader_lock:
+        for t in threads:
+            t.start()
+        while True:
+            with provenance_engine._audit_queue_lock:
+                if len(provenance_engine._audit_queue) == len(plan):
+                    break
+            time.sleep(0.001)
+    for t in threads:
+        t.join()
+
+    assert outcomes == {"good1": "ok", "poison": "integrity", "good2": "ok"}
+    records = list_provenance_events(case_id)
+    assert sorted(r["request_id"] for r in records[1:]) == ["good1", "good2"]
+    assert validate_case_chain(case_id).ok is True
+
+
+def test_init_gathers_planner_statistics(isolated_env):
+    conn = sqlite3.connect(isolated_env["db_path"])
+    try:
+        row = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+        ).fetchone()
+    finally:
+        conn.close()
+    assert row is not None
@@ -1,4 +1,20 @@
-from utils.crypto_utils import sha256_bytes
+import hashlib
+import hmac
+import json
+
+from utils.crypto_utils import (
+    MMAP_THRESHOLD,
+    PREFETCH_WINDOW,
+    canonical_event_bytes,
+    canonical_json,
+    hex_digest_equal,
+    hmac_sha256_hex,
+    hmac_sha256_hex_with,
+    hmac_sha256_keyed,
+    sha256_bytes,
+    sha256_file,
+    token_hex,
+)
 
 
 def test_sha256_bytes_known_vector():
@@ -6,3 +22,78 @@ def test_sha256_bytes_known_vector():
         sha256_bytes(b"abc")
         == "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
     )
+
+
+def test_canonical_json_matches_stdlib_encoding():
+    # Stored provenance hashes were computed with json.dumps; the bytes must not drift.
+    record = {
+        "case_id": 7,
+        "file_version_id": None,
+        "action": "VERIFY",
+        "prev_hash": "GENESIS",
+        "user_agent": 'Mozilla/5.0 "ünïcode"   \x01\n',
+    }
+    expected = json.dumps(
+        record, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+    assert canonical_json(record) == expected
+
+
+def test_sha256_file_matches_bytes_for_small_and_large_files(tmp_path):
+    for size in (0, 10, MMAP_THRESHOLD, MMAP_THRESHOLD * 3 + 7):
+        data = bytes(i % 251 for i in range(size))
+        path = tmp_path / f"f{size}.bin"
+        path.write_bytes(data)
+        assert sha256_file(str(path)) == sha256_bytes(data)
+
+
+def test_sha256_file_spans_prefetch_windows(tmp_path):
+    # Not a multiple of the window, so the last window is partial.
+    data = bytes(range(251)) * ((PREFETCH_WINDOW * 2) // 251 + 1)
+    path = tmp_path / "windows.bin"
+    path.write_bytes(data)
+    assert sha256_file(str(path)) == sha256_bytes(data)
+
+
+def test_canonical_event_bytes_matches_canonical_json():
+    core = {
+        "case_id": 3,
+        "file_version_id": None,
+        "action": "VERIFY",
+        "file_hash": "ab" * 32,
+        "prev_hash": "GENESIS",
+        "timestamp": "2026-01-21T19:10:01+00:00",
+        "system_id": "host-0011223344556677",
+        "request_id": "cd" * 16,
+        "client_ip": None,
+        "user_agent": "Mözilla \"quoted\"",
+    }
+    assert canonical_event_bytes(**core) == canonical_json(core)
+
+
+def test_hmac_helpers_agree_with_stdlib():
+    key = b"k" * 32
+    msg = "ab" * 32
+    expected = hmac.new(key, msg.encode("utf-8"), hashlib.sha256).hexdigest()
+    assert hmac_sha256_hex(key, msg) == expected
+    assert hmac_sha256_hex_with(hmac_sha256_keyed(key), msg) == expected
+
+    # Short, block-sized and over-long keys take different padding paths.
+    for size in (1, 64, 65, 200):
+        key = bytes(i % 256 for i in range(size))
+        expected = hmac.new(key, msg.encode("utf-8"), hashlib.sha256).hexdigest()
+        assert hmac_sha256_hex_with(hmac_sha256_keyed(key), msg) == expected
+
+
+def test_token_hex_is_unique_across_pool_refills():
+    tokens = [token_hex(16) for _ in range(1000)]
+    assert all(len(t) == 32 for t in tokens)
+    assert len(set(tokens)) == len(tokens)
+
+
+def test_hex_digest_equal_rejects_mismatch_and_garbage():
+    digest = "ab" * 32
+    assert hex_digest_equal(digest, digest) is True
+    assert hex_digest_equal("00" * 32, digest) is False
+    assert hex_digest_equal("é" * 64, digest) is False
+    assert hex_digest_equal(None, digest) is False
@@ -0,0 +1,31 @@
+import io
+import os
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from utils.crypto_utils import sha256_file
+from utils.file_utils import save_upload
+
+
+def test_save_upload_returns_digest_of_stored_bytes(tmp_path):
+    # Several chunks plus a partial one, to exercise the hash-while-writing loop.
+    data = os.urandom(3 * 4096 + 17)
+    upload = FileStorage(stream=io.BytesIO(data), filename="my evidence.bin")
+    upload_dir = tmp_path / "uploads"
+
+    safe_name, stored_path, digest = save_upload(upload, str(upload_dir), chunk_size=4096)
+
+    assert safe_name == "my_evidence.bin"
+    assert os.path.dirname(stored_path) == str(upload_dir)
+    assert stored_path.endswith("__my_evidence.bin")
+    with open(stored_path, "rb") as f:
+        assert f.read() == data
+    assert digest == sha256_file(stored_path)
+
+
+def test_save_upload_rejects_invalid_filename(tmp_path):
+    upload = FileStorage(stream=io.BytesIO(b"x"), filename="../")
+    with pytest.raises(ValueError):
+        save_upload(upload, str(tmp_path / "uploads"))
+    assert list((tmp_path / "uploads").iterdir()) == []
@@ -1,7 +1,23 @@
+import contextvars
+import hashlib
+import os
 import sqlite3
+import time
 
-from verifier import verify_file_against_provenance
-from provenance_engine import register_upload_as_new_version
+import pytest
+
+import verifier
+from verifier import (
+    verify_file_against_provenance,
+    verify_hash_against_provenance,
+    verify_with_case_id,
+)
+from provenance_engine import (
+    list_provenance_events,
+    load_or_create_hmac_key,
+    register_upload_as_new_version,
+    validate_chain,
+)
 
 
 def test_verify_valid_and_tampered_file(isolated_env, tmp_path):
@@ -97,3 +113,302 @@ def test_verify_tampered_hmac(isolated_env, tmp_path):
         user_agent="pytest",
     )
     assert res.status == "TAMPERED_HMAC"
+
+
+def test_verify_rehashes_file_changed_in_place(isolated_env, tmp_path, monkeypatch):
+    # Let the freshly written test file into the stat-keyed digest memo.
+    monkeypatch.setattr(verifier, "_HASH_MEMO_MIN_AGE_NS", -1)
+
+    stored = tmp_path / "m.bin"
+    stored.write_bytes(b"original")
+
+    reg = register_upload_as_new_version(
+        filename="m.bin",
+        stored_path=str(stored),
+        file_hash="0682c5f2076f099c34cfdd15a9e063849ed437a49677e6fcc5b4198c76575be5",
+        request_id="req1",
+        client_ip="127.0.0.1",
+        user_agent="pytest",
+    )
+    case_id = int(reg["case"]["id"])
+
+    old = 1_600_000_000
+    os.utime(stored, (old, old))
+
+    kwargs = dict(
+        file_path=str(stored),
+        filename="m.bin",
+        case_id=case_id,
+        request_id="req2",
+        client_ip="127.0.0.1",
+        user_agent="pytest",
+    )
+    assert verify_file_against_provenance(**kwargs).status == "VALID"
+    assert verify_file_against_provenance(**kwargs).status == "VALID"
+
+    # Same size and mtime: only the ctime change reveals the modification.
+    time.sleep(0.05)
+    stored.write_bytes(b"modifiex")
+    os.utime(stored, (old, old))
+    assert verify_file_against_provenance(**kwargs).status == "TAMPERED_FILE"
+
+
+def test_verify_large_file_hashed_in_background(isolated_env, tmp_path):
+    data = os.urandom(2 * 1024 * 1024)
+    stored = tmp_path / "big.bin"
+    stored.write_bytes(data)
+
+    reg = register_upload_as_new_version(
+        filename="big.bin",
+        stored_path=str(stored),
+        file_hash=hashlib.sha256(data).hexdigest(),
+        request_id="req1",
+        client_ip="127.0.0.1",
+        user_agent="pytest",
+    )
+
+    res = verify_file_against_provenance(
+        file_path=str(stored),
+        filename="big.bin",
+        case_id=None,
+        request_id="req2",
+        client_ip="127.0.0.1",
+        user_agent="pytest",
+    )
+    assert res.status == "VALID"
+    assert res.case_id == int(reg["case"]["id"])
+    assert res.observed_sha256 == hashlib.sha256(data).hexdigest()
+
+
+def test_verify_with_case_id_fast_path(isolated_env, tmp_path):
+    stored = tmp_path / "fast.bin"
+    stored.write_bytes(b"original")
+    digest = hashlib.sha256(b"original").hexdigest()
+
+    reg = register_upload_as_new_version(
+        filename="fast.bin",
+        stored_path=str(stored),
+        file_hash=digest,
+        request_id="req1",
+        client_ip="127.0.0.1",
+        user_agent="pytest",
+    )
+    case_id = int(reg["case"]["id"])
+
+    res = verify_with_case_id(
+        observed_sha256=digest,
+        case_id=case_id,
+        request_id="req2",
+        client_ip=None,
+        user_agent=None,
+    )
+    assert res.status == "VALID"
+    assert res.case_id == case_id
+
+    missing = verify_with_case_id(
+        observed_sha256=digest,
+        case_id=case_id + 1,
+        request_id="req3",
+        client_ip=None,
+        user_agent=None,
+    )
+    assert missing.status == "MISSING_HISTORY"
+    assert missing.case_id is None
+
+
+def test_request_scope_validates_chain_once_per_case(isolated_env, tmp_path, monkeypatch):
+    stored = tmp_path / "batch.bin"
+    stored.write_bytes(b"original")
+    digest = hashlib.sha256(b"original").hexdigest()
+
+    reg = register_upload_as_new_version(
+        filename="batch.bin",
+        stored_path=str(stored),
+        file_hash=digest,
+        request_id="req1",
+        client_ip="127.0.0.1",
+        user_agent="pytest",
+    )
+    case_id = int(reg["case"]["id"])
+
+    calls = []
+    real = verifier.validate_case_chain
+
+    def counting(cid):
+        calls.append(cid)
+        return real(cid)
+
+    monkeypatch.setattr(verifier, "validate_case_chain", counting)
+
+    def batch():
+        verifier.begin_request_scope()
+        return [
+            verify_with_case_id(
+                observed_sha256=digest,
+                case_id=case_id,
+                request_id=f"batch{i}",
+                client_ip=None,
+                user_agent=None,
+            ).status
+            for i in range(3)
+        ]
+
+    # Run in a copied context so the scope does not leak into other tests.
+    assert contextvars.copy_context().run(batch) == ["VALID"] * 3
+    assert calls == [case_id]
+
+    # Outside a request scope every verify validates again.
+    verify_with_case_id(
+        observed_sha256=digest,
+        case_id=case_id,
+        request_id="unscoped",
+        client_ip=None,
+        user_agent=None,
+    )
+    assert calls == [case_id, case_id]
+
+
+def test_verify_file_reuses_caller_digest(isolated_env, tmp_path, monkeypatch):
+    stored = tmp_path / "reuse.bin"
+    stored.write_bytes(b"original")
+    digest = hashlib.sha256(b"original").hexdigest()
+
+    register_upload_as_new_version(
+        filename="reuse.bin",
+        stored_path=str(stored),
+        file_hash=digest,
+        request_id="req1",
+        client_ip="127.0.0.1",
+        user_agent="pytest",
+    )
+
+    def no_hash(path):
+        raise AssertionError("file was re-hashed")
+
+    monkeypatch.setattr(verifier, "_sha256_file_memoized", no_hash)
+    res = verify_file_against_provenance(
+        file_path=str(stored),
+        filename="reuse.bin",
+        case_id=None,
+        request_id="req2",
+        client_ip=None,
+        user_agent=None,
+        observed_sha256=digest,
+    )
+    assert res.status == "VALID"
+
+    with pytest.raises(ValueError):
+        verify_file_against_provenance(
+            file_path=str(stored),
+            filename="reuse.bin",
+            case_id=None,
+            request_id="req3",
+            client_ip=None,
+            user_agent=None,
+            observed_sha256=digest.upper(),
+        )
+    with pytest.raises(ValueError):
+        verify_hash_against_provenance(
+            observed_sha256="not-a-digest",
+            filename="reuse.bin",
+            case_id=None,
+            request_id="req4",
+            client_ip=None,
+            user_agent=None,
+        )
+
+
+def test_verify_file_rehashes_when_size_differs_from_recorded(isolated_env, tmp_path):
+    stored = tmp_path / "grown.bin"
+    stored.write_bytes(b"original")
+    digest = hashlib.sha256(b"original").hexdigest()
+
+    register_upload_as_new_version(
+        filename="grown.bin",
+        stored_path=str(stored),
+        file_hash=digest,
+        request_id="req1",
+        client_ip="127.0.0.1",
+        user_agent="pytest",
+    )
+
+    # A stale caller digest must not vouch for a file whose size has changed.
+    stored.write_bytes(b"original plus appended bytes")
+    res = verify_file_against_provenance(
+        file_path=str(stored),
+        filename="grown.bin",
+        case_id=None,
+        request_id="req2",
+        client_ip=None,
+        user_agent=None,
+        observed_sha256=digest,
+    )
+    assert res.status == "TAMPERED_FILE"
+    assert res.observed_sha256 == hashlib.sha256(b"original plus appended bytes").hexdigest()
+
+
+def test_verify_coerces_loosely_typed_case_id(isolated_env, tmp_path):
+    stored = tmp_path / "loose.bin"
+    stored.write_bytes(b"original")
+    digest = hashlib.sha256(b"original").hexdigest()
+
+    reg = register_upload_as_new_version(
+        filename="loose.bin",
+        stored_path=str(stored),
+        file_hash=digest,
+        request_id="req1",
+        client_ip="127.0.0.1",
+        user_agent="pytest",
+    )
+    case_id = int(reg["case"]["id"])
+
+    res = verify_hash_against_provenance(
+        observed_sha256=digest,
+        filename="loose.bin",
+        case_id=str(case_id),
+        request_id="req2",
+        client_ip=None,
+        user_agent=None,
+    )
+    assert res.status == "VALID"
+    assert res.case_id == case_id and isinstance(res.case_id, int)
+
+    # The VERIFY event must be sealed over the stored integer ID.
+    events = list_provenance_events(case_id)
+    assert validate_chain(events, load_or_create_hmac_key()).ok is True
+
+
+def test_verify_with_case_id_accepts_non_int_case_id(isolated_env, tmp_path):
+    stored = tmp_path / "fast-loose.bin"
+    stored.write_bytes(b"original")
+    digest = hashlib.sha256(b"original").hexdigest()
+
+    reg = register_upload_as_new_version(
+        filename="fast-loose.bin",
+        stored_path=str(stored),
+        file_hash=digest,
+        request_id="req1",
+        client_ip="127.0.0.1",
+        user_agent="pytest",
+    )
+    case_id = int(reg["case"]["id"])
+
+    res = verify_with_case_id(
+        observed_sha256=digest,
+        case_id=str(case_id),
+        request_id="req2",
+        client_ip=None,
+        user_agent=None,
+    )
+    assert res.status == "VALID"
+    assert isinstance(res.case_id, int) and res.case_id == case_id
+    assert validate_chain(list_provenance_events(case_id), load_or_create_hmac_key()).ok is True
+
+    with pytest.raises(ValueError):
+        verify_with_case_id(
+            observed_sha256=digest[:-1],
+            case_id=case_id,
+            request_id="req3",
+            client_ip=None,
+            user_agent=None,
+        )
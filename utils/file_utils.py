@@ -1,26 +1,40 @@
+import hashlib
 import os
-import secrets
 from typing import Tuple
 
 from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 
+from utils.crypto_utils import token_hex
+
 
 def ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
 
-def save_upload(file_obj: FileStorage, upload_dir: str) -> Tuple[str, str]:
-    ensure_dir(upload_dir)
-
+def safe_upload_name(file_obj: FileStorage) -> str:
     original_name = file_obj.filename or ""
     safe_name = secure_filename(original_name)
     if safe_name == "":
         raise ValueError("Invalid filename")
+    return safe_name
+
+
+def save_upload(
+    file_obj: FileStorage, upload_dir: str, chunk_size: int = 1024 * 1024
+) -> Tuple[str, str, str]:
+    ensure_dir(upload_dir)
+
+    safe_name = safe_upload_name(file_obj)
 
-    token = secrets.token_hex(8)
+    token = token_hex(8)
     stored_name = f"{token}__{safe_name}"
     stored_path = os.path.join(upload_dir, stored_name)
 
-    file_obj.save(stored_path)
-    return safe_name, stored_path
+    # Hash while writing so the upload is not read back from disk a second time.
+    h = hashlib.sha256()
+    with open(stored_path, "wb") as out:
+        for chunk in iter(lambda: file_obj.stream.read(chunk_size), b""):
+            h.update(chunk)
+            out.write(chunk)
+    return safe_name, stored_path, h.hexdigest()
@@ -1,18 +1,23 @@
-from dataclasses import dataclass
-from typing import Optional
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
 
 from provenance_engine import (
-    append_provenance_event,
-    get_case,
+    ChainValidationResult,
+    append_provenance_event_grouped,
+    get_case_with_latest_version,
     get_latest_case_by_filename,
     get_latest_file_version,
     validate_case_chain,
 )
-from utils.crypto_utils import sha256_file
+from utils.crypto_utils import MMAP_THRESHOLD, sha256_file
 
 
-@dataclass(frozen=True)
-class VerificationResult:
+class VerificationResult(NamedTuple):
     status: str  # VALID | TAMPERED_FILE | TAMPERED_CHAIN | TAMPERED_HMAC | MISSING_HISTORY
     reason: str
     expected_sha256: Optional[str] = None
@@ -20,6 +25,81 @@ class VerificationResult:
     case_id: Optional[int] = None
 
 
+# Digest memo for repeated verifies of the same on-disk file, keyed on its stat identity.
+# ctime cannot be set from userspace, so any content change invalidates the entry.
+_HASH_MEMO_MAX = 10_000
+_HASH_MEMO_MIN_AGE_NS = 2_000_000_000
+_hash_memo: "OrderedDict[Tuple[int, ...], str]" = OrderedDict()
+_hash_memo_lock = threading.Lock()
+
+_hash_executor = ThreadPoolExecutor(thread_name_prefix="verify-hash")
+
+_HEX_DIGITS = frozenset("0123456789abcdef")
+
+# observed(expected_size) yields the file digest. It is called once the DB work is
+# done, with the latest version's recorded file_size (None if there is no version).
+_Observed = Callable[[Optional[int]], str]
+
+# Chain results already computed in the current request, keyed by case_id. None
+# outside a request scope, in which case every verify validates the chain itself.
+_request_chain_results: "ContextVar[Optional[Dict[int, ChainValidationResult]]]" = (
+    ContextVar("_request_chain_results", default=None)
+)
+
+
+def begin_request_scope() -> "Token[Optional[Dict[int, ChainValidationResult]]]":
+    # Called by the web layer at the start of each request; verifies of the same case
+    # within that request then share one chain validation. The returned token must be
+    # passed to end_request_scope when the request ends, or the cached results would
+    # outlive the request and hide later tampering.
+    return _request_chain_results.set({})
+
+
+def end_request_scope(token: "Token[Optional[Dict[int, ChainValidationResult]]]") -> None:
+    _request_chain_results.reset(token)
+
+
+def _validate_case_chain_once(case_id: int) -> ChainValidationResult:
+    scope = _request_chain_results.get()
+    if scope is None:
+        return validate_case_chain(case_id)
+    result = scope.get(case_id)
+    if result is None:
+        result = scope[case_id] = validate_case_chain(case_id)
+    return result
+
+
+def _stat_key(st: os.stat_result) -> Tuple[int, ...]:
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+
+
+def _sha256_file_memoized(file_path: str) -> str:
+    key = _stat_key(os.stat(file_path))
+    with _hash_memo_lock:
+        digest = _hash_memo.get(key)
+        if digest is not None:
+            _hash_memo.move_to_end(key)
+            return digest
+
+    digest = sha256_file(file_path)
+
+    # Only remember files that did not change while hashing and whose timestamps are
+    # old enough that a same-tick rewrite cannot go unnoticed (git's "racy clean" rule).
+    st = os.stat(file_path)
+    if _stat_key(st) == key and time.time_ns() - st.st_ctime_ns > _HASH_MEMO_MIN_AGE_NS:
+        with _hash_memo_lock:
+            _hash_memo[key] = digest
+            if len(_hash_memo) > _HASH_MEMO_MAX:
+                _hash_memo.popitem(last=False)
+    return digest
+
+
+def _require_sha256_hex(value: str) -> None:
+    # Applied to every caller-supplied digest before it can be sealed into an event.
+    if not isinstance(value, str) or len(value) != 64 or not _HEX_DIGITS.issuperset(value):
+        raise ValueError("observed_sha256 must be a lowercase hex SHA-256 digest")
+
+
 def verify_file_against_provenance(
     *,
     file_path: str,
@@ -28,80 +108,230 @@ def verify_file_against_provenance(
     request_id: str,
     client_ip: Optional[str],
     user_agent: Optional[str],
+    observed_sha256: Optional[str] = None,
 ) -> VerificationResult:
-    observed = sha256_file(file_path)
+    # observed_sha256: digest the caller already computed from the exact bytes at
+    # file_path (e.g. while writing them). It is trusted only while the file on disk
+    # still has the size recorded for the latest version; otherwise the file is hashed.
+    size = os.path.getsize(file_path)
+    observed: _Observed
+    if observed_sha256 is not None:
+        _require_sha256_hex(observed_sha256)
+        trusted = observed_sha256
 
-    resolved_case_id: Optional[int] = None
-    if case_id is not None:
-        case = get_case(int(case_id))
-        if case is None:
-            return VerificationResult(
-                status="MISSING_HISTORY",
-                reason="Provided case_id does not exist",
-                expected_sha256=None,
-                observed_sha256=observed,
-                case_id=None,
-            )
-        resolved_case_id = int(case["id"])
+        def observed(expected_size: Optional[int]) -> str:
+            if expected_size is not None and expected_size != size:
+                return _sha256_file_memoized(file_path)
+            return trusted
+
+    elif size < MMAP_THRESHOLD:
+        digest = _sha256_file_memoized(file_path)
+        observed = lambda _expected_size: digest
     else:
-        case = get_latest_case_by_filename(filename)
-        if case is None:
-            return VerificationResult(
-                status="MISSING_HISTORY",
-                reason="No case exists for this filename",
-                expected_sha256=None,
-                observed_sha256=observed,
-                case_id=None,
-            )
-        resolved_case_id = int(case["id"])
-
-    chain = validate_case_chain(resolved_case_id)
+        # Large file: hash on a worker thread (OpenSSL releases the GIL) while the
+        # case lookup and chain validation run here.
+        pending = _hash_executor.submit(_sha256_file_memoized, file_path)
+        observed = lambda _expected_size: pending.result()
+
+    return _verify(
+        observed=observed,
+        filename=filename,
+        case_id=None if case_id is None else int(case_id),
+        request_id=request_id,
+        client_ip=client_ip,
+        user_agent=user_agent,
+    )
+
+
+def verify_hash_against_provenance(
+    *,
+    observed_sha256: str,
+    filename: str,
+    case_id: Optional[int],
+    request_id: str,
+    client_ip: Optional[str],
+    user_agent: Optional[str],
+) -> VerificationResult:
+    # The entry point for callers that already hold the digest (e.g. hashed straight
+    # off the request stream). With a case_id it is exactly verify_with_case_id.
+    if case_id is not None:
+        return verify_with_case_id(
+            observed_sha256=observed_sha256,
+            case_id=case_id,
+            request_id=request_id,
+            client_ip=client_ip,
+            user_agent=user_agent,
+        )
+    _require_sha256_hex(observed_sha256)
+    return _verify(
+        observed=lambda _expected_size: observed_sha256,
+        filename=filename,
+        case_id=None,
+        request_id=request_id,
+        client_ip=client_ip,
+        user_agent=user_agent,
+    )
+
+
+def _result(
+    status: str,
+    reason: str,
+    *,
+    expected: Optional[str] = None,
+    observed: Optional[str],
+    case_id: Optional[int],
+) -> VerificationResult:
+    return VerificationResult(
+        status=status,
+        reason=reason,
+        expected_sha256=expected,
+        observed_sha256=observed,
+        case_id=case_id,
+    )
+
+
+def verify_with_case_id(
+    *,
+    observed_sha256: str,
+    case_id: int,
+    request_id: str,
+    client_ip: Optional[str],
+    user_agent: Optional[str],
+) -> VerificationResult:
+    # verify_hash_against_provenance(case_id=...) for callers that have no filename:
+    # one joined case/version lookup, no filename resolution.
+    _require_sha256_hex(observed_sha256)
+    return _verify_case(
+        observed=lambda _expected_size: observed_sha256,
+        case_id=int(case_id),
+        request_id=request_id,
+        client_ip=client_ip,
+        user_agent=user_agent,
+    )
+
+
+def _verify(
+    *,
+    observed: _Observed,
+    filename: str,
+    case_id: Optional[int],
+    request_id: str,
+    client_ip: Optional[str],
+    user_agent: Optional[str],
+) -> VerificationResult:
+    # The public entry points coerce case_id to int once, so it is not repeated here.
+    if case_id is not None:
+        return _verify_case(
+            observed=observed,
+            case_id=case_id,
+            request_id=request_id,
+            client_ip=client_ip,
+            user_agent=user_agent,
+        )
+
+    case = get_latest_case_by_filename(filename)
+    if case is None:
+        return _result(
+            "MISSING_HISTORY",
+            "No case exists for this filename",
+            observed=observed(None),
+            case_id=None,
+        )
+    return _finalize(
+        observed=observed,
+        case_id=case["id"],
+        latest_version=get_latest_file_version(case["id"]),
+        request_id=request_id,
+        client_ip=client_ip,
+        user_agent=user_agent,
+    )
+
+
+def _verify_case(
+    *,
+    observed: _Observed,
+    case_id: int,
+    request_id: str,
+    client_ip: Optional[str],
+    user_agent: Optional[str],
+) -> VerificationResult:
+    case, latest_version = get_case_with_latest_version(case_id)
+    if case is None:
+        return _result(
+            "MISSING_HISTORY",
+            "Provided case_id does not exist",
+            observed=observed(None),
+            case_id=None,
+        )
+    # Seal the stored ID into the VERIFY event, never the caller's value.
+    return _finalize(
+        observed=observed,
+        case_id=case["id"],
+        latest_version=latest_version,
+        request_id=request_id,
+        client_ip=client_ip,
+        user_agent=user_agent,
+    )
+
+
+def _finalize(
+    *,
+    observed: _Observed,
+    case_id: int,
+    latest_version: Optional[Dict[str, Any]],
+    request_id: str,
+    client_ip: Optional[str],
+    user_agent: Optional[str],
+) -> VerificationResult:
+    expected_size = None if latest_version is None else latest_version["file_size"]
+
+    chain = _validate_case_chain_once(case_id)
     if not chain.ok:
         status = "TAMPERED_CHAIN" if chain.failure_type == "CHAIN" else "TAMPERED_HMAC"
-        return VerificationResult(
-            status=status,
-            reason=f"Provenance chain validation failed: {chain.error}",
-            expected_sha256=None,
-            observed_sha256=observed,
-            case_id=resolved_case_id,
+        return _result(
+            status,
+            f"Provenance chain validation failed: {chain.error}",
+            observed=observed(expected_size),
+            case_id=case_id,
         )
 
-    latest_version = get_latest_file_version(resolved_case_id)
     if latest_version is None:
-        return VerificationResult(
-            status="MISSING_HISTORY",
-            reason="No file versions exist for this case",
-            expected_sha256=None,
-            observed_sha256=observed,
-            case_id=resolved_case_id,
+        return _result(
+            "MISSING_HISTORY",
+            "No file versions exist for this case",
+            observed=observed(expected_size),
+            case_id=case_id,
         )
 
     expected = latest_version["file_hash"]
+    digest = observed(expected_size)
 
-    # Record verification attempt as an append-only audit event.
-    append_provenance_event(
-        case_id=resolved_case_id,
+    # Record verification attempt as an append-only audit event (group-committed
+    # with concurrent verifies; still durable before we answer).
+    append_provenance_event_grouped(
+        case_id=case_id,
         file_version_id=None,
         action="VERIFY",
-        file_hash=observed,
+        file_hash=digest,
         request_id=request_id,
         client_ip=client_ip,
         user_agent=user_agent,
     )
 
-    if observed == expected:
-        return VerificationResult(
-            status="VALID",
-            reason="File hash matches the latest stored file version",
-            expected_sha256=expected,
-            observed_sha256=observed,
-            case_id=resolved_case_id,
+    # Both sides are 64-char ASCII hex; str == is already a single memcmp here.
+    if digest == expected:
+        return _result(
+            "VALID",
+            "File hash matches the latest stored file version",
+            expected=expected,
+            observed=digest,
+            case_id=case_id,
         )
 
-    return VerificationResult(
-        status="TAMPERED_FILE",
-        reason="File hash does NOT match the latest stored file version",
-        expected_sha256=expected,
-        observed_sha256=observed,
-        case_id=resolved_case_id,
+    return _result(
+        "TAMPERED_FILE",
+        "File hash does NOT match the latest stored file version",
+        expected=expected,
+        observed=digest,
+        case_id=case_id,
     )